@@ -1,5 +1,20 @@
+import os
 import sys
 import math
+import mmap
+import numpy as np
+
+
+#maps b'a'..b'z' onto b'A'..b'Z' so upper and lower case land in the same bin
+UPPER_TABLE=bytes.maketrans(b'abcdefghijklmnopqrstuvwxyz',
+                            b'ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+#bytes read per chunk by the numpy backend
+CHUNK_SIZE=1<<24
+#bytes per window of the memory-mapped backend (a multiple of the page size)
+WINDOW_SIZE=1<<22
+#log-probability tables already loaded in this process, keyed by absolute
+#path and holding (mtime_ns of the source file, array)
+LOG_PARAMETER_CACHE={}
 
 
 def get_parameter_vectors():
@@ -34,17 +49,326 @@ def get_parameter_vectors():
 
     return (e,s)
 
-def shred(filename):
+def parse_parameter_file(filename):
+    '''
+    Parses one "<letter> <probability>" table such as e.txt into a numpy
+    array of 26 probabilities, p[0] being the probability of 'A'
+    '''
+    p=np.zeros(26,dtype=np.float64)
+    with open(filename,encoding='utf-8') as f:
+        for line in f:
+            char,prob=line.strip().split(" ")
+            p[ord(char)-ord('A')]=float(prob)
+    return p
+
+def load_log_parameters(filename):
+    '''
+    Returns the log-probabilities of a parameter table as a numpy array of
+    length 26. The table is parsed at most once per process; the parsed
+    result is also kept in a binary sidecar (<filename>.npz) next to the
+    table so that later processes skip parsing. Both caches are keyed by
+    the mtime of the table and are rebuilt as soon as it changes.
+    '''
+    path=os.path.abspath(filename)
+    mtime=os.stat(path).st_mtime_ns
+
+    cached=LOG_PARAMETER_CACHE.get(path)
+    if cached is not None and cached[0]==mtime:
+        return cached[1]
+
+    sidecar=path+'.npz'
+    log_p=None
+    try:
+        with np.load(sidecar) as data:
+            if int(data['mtime_ns'])==mtime:
+                log_p=data['log_p']
+    except (OSError,KeyError,ValueError):
+        pass
+
+    if log_p is None:
+        log_p=np.log(parse_parameter_file(path))
+        #write to a temporary file first so concurrent workers never read
+        #a half-written sidecar; a read-only directory just means no sidecar
+        tmp='%s.%d.tmp' % (sidecar,os.getpid())
+        try:
+            with open(tmp,'wb') as f:
+                np.savez(f,mtime_ns=np.int64(mtime),log_p=log_p)
+            os.replace(tmp,sidecar)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    log_p.setflags(write=False)
+    LOG_PARAMETER_CACHE[path]=(mtime,log_p)
+    return log_p
+
+def get_log_parameter_vectors():
+    '''
+    Cached counterpart of get_parameter_vectors()
+
+    Returns: tuple of numpy arrays log(e) and log(s)
+    '''
+    return (load_log_parameters('e.txt'),load_log_parameters('s.txt'))
+
+def shred(filename, backend='python'):
     #Using a dictionary here. You may change this to any data structure of
     #your choice such as lists (X=[]) etc. for the assignment
+    if backend=='numpy':
+        return shred_numpy(filename)
+    if backend=='mmap':
+        totals=shred_windows(filename).sum(axis=0)
+        return {chr(ord('A')+i):int(totals[i]) for i in range(26)}
+    if backend!='python':
+        raise ValueError("unknown shred backend: %r" % (backend,))
+
     X=dict()
+    for i in range(26):
+        X[chr(ord('A')+i)]=0
     with open (filename,encoding='utf-8') as f:
-        # TODO: add your code here
+        for line in f:
+            for char in line:
+                #only count the 26 ASCII letters, case-folded to upper case
+                if char.isascii() and char.isalpha():
+                    X[char.upper()]+=1
+
+    return X
+
+def shred_numpy(filename, chunk_size=CHUNK_SIZE):
+    '''
+    Same counts as shred() but computed over the raw bytes: the file is read
+    in large binary chunks, case-folded with UPPER_TABLE and histogrammed
+    with np.bincount. In UTF-8 every byte of a multi-byte character is
+    >= 0x80, so only real ASCII letters fall into the A-Z bins.
 
+    Returns: dictionary of the 26 letter counts, like shred()
+    '''
+    hist=np.zeros(256,dtype=np.int64)
+    with open(filename,'rb') as f:
+        while True:
+            chunk=f.read(chunk_size)
+            if not chunk:
+                break
+            data=np.frombuffer(chunk.translate(UPPER_TABLE),dtype=np.uint8)
+            hist+=np.bincount(data,minlength=256)
+
+    X=dict()
+    for i in range(26):
+        X[chr(ord('A')+i)]=int(hist[ord('A')+i])
     return X
 
+def aligned_window_size(window_size):
+    #mmap offsets and madvise ranges have to be page aligned, so round the
+    #window down to a multiple of the allocation granularity (at least one)
+    step=mmap.ALLOCATIONGRANULARITY
+    return max(step,window_size//step*step)
+
+def shred_windows(filename, window_size=WINDOW_SIZE):
+    '''
+    Maps the file into memory and counts the letters of every window of
+    window_size bytes without ever decoding the text into a Python string.
+    Pages of a window are dropped again once it has been counted, so the
+    resident set stays at about one window whatever the file size.
+
+    Returns: (number of windows x 26) int64 array, row k holding the counts
+    of bytes [k*window_size, (k+1)*window_size)
+    '''
+    window_size=aligned_window_size(window_size)
+
+    with open(filename,'rb') as f:
+        size=f.seek(0,2)
+        n_windows=(size+window_size-1)//window_size
+        counts=np.zeros((n_windows,26),dtype=np.int64)
+        if size==0:
+            return counts
+
+        mm=mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ)
+        try:
+            for k in range(n_windows):
+                start=k*window_size
+                length=min(window_size,size-start)
+                window=np.frombuffer(mm,dtype=np.uint8,count=length,offset=start)
+                hist=np.bincount(window,minlength=256)
+                #fold case: 'a'..'z' sit 32 bins above 'A'..'Z'
+                counts[k]=hist[ord('A'):ord('Z')+1]+hist[ord('a'):ord('z')+1]
+                del window
+                if hasattr(mm,'madvise') and hasattr(mmap,'MADV_DONTNEED'):
+                    mm.madvise(mmap.MADV_DONTNEED,start,length)
+        finally:
+            mm.close()
+
+    return counts
+
+def language_spans(filename, log_e, log_s, window_size=WINDOW_SIZE):
+    '''
+    Splits a (possibly mixed-language) file into English and Spanish spans
+    in one pass: every window of shred_windows() is classified on its own
+    with the log tables of get_log_parameter_vectors() and neighbouring
+    windows with the same label are merged.
+
+    Returns: list of (start byte, end byte, 'English' or 'Spanish')
+    '''
+    counts=shred_windows(filename,window_size)
+    window_size=aligned_window_size(window_size)
+    with open(filename,'rb') as f:
+        size=f.seek(0,2)
+
+    #one matrix product scores every window at once
+    f_e=math.log(0.6)+counts@log_e
+    f_s=math.log(0.4)+counts@log_s
+
+    spans=[]
+    for k in range(len(counts)):
+        label='English' if f_e[k]>=f_s[k] else 'Spanish'
+        start=k*window_size
+        end=min(start+window_size,size)
+        if spans and spans[-1][2]==label:
+            spans[-1]=(spans[-1][0],end,label)
+        else:
+            spans.append((start,end,label))
+    return spans
+
+def counts_vector(X):
+    '''
+    Turns the dictionary returned by shred() into a list of 26 counts with
+    c[0] being the count of 'A' and so on, matching the layout of e and s
+    '''
+    return [X[chr(ord('A')+i)] for i in range(26)]
+
+def language_scores(c, e, s, prior_e=0.6, prior_s=0.4):
+    '''
+    Computes F(English) and F(Spanish) as described in section 1.3 of the
+    writeup, i.e. log P(y) + sum_i X_i log p_i for the count vector c
+
+    Returns: tuple (F(English), F(Spanish))
+    '''
+    f_e=math.log(prior_e)
+    f_s=math.log(prior_s)
+    for i in range(26):
+        if c[i]!=0:
+            f_e+=c[i]*math.log(e[i])
+            f_s+=c[i]*math.log(s[i])
+    return (f_e,f_s)
+
+def log_language_scores(c, log_e, log_s, prior_e=0.6, prior_s=0.4):
+    '''
+    Same as language_scores() but with the pre-logged tables of
+    get_log_parameter_vectors(), so each score is a single dot product
+
+    Returns: tuple (F(English), F(Spanish))
+    '''
+    c=np.asarray(c,dtype=np.float64)
+    return (math.log(prior_e)+float(c@log_e),math.log(prior_s)+float(c@log_s))
+
+class LanguageRegistry:
+    '''
+    Any number of languages, each given by a "<letter> <probability>" table
+    like e.txt, stacked into one (languages x 26) log-probability matrix so
+    that a whole batch of documents is classified with one matrix multiply
+    '''
+
+    def __init__(self):
+        self.names=[]
+        self.filenames=[]
+        self.priors=[]
+        self.matrix=np.zeros((0,26),dtype=np.float64)
+        self.log_priors=np.zeros(0,dtype=np.float64)
+
+    @classmethod
+    def from_files(cls, filenames, priors=None):
+        '''
+        Builds a registry from <lang>.txt files; the language is named after
+        the file. priors maps names to prior weights (uniform if omitted).
+        '''
+        registry=cls()
+        for filename in filenames:
+            name=os.path.splitext(os.path.basename(filename))[0]
+            prior=1.0 if priors is None else priors[name]
+            registry.register(name,filename,prior)
+        return registry
+
+    def register(self, name, filename, prior=1.0):
+        if name in self.names:
+            raise ValueError("language %r is already registered" % (name,))
+        self.names.append(name)
+        self.filenames.append(filename)
+        self.priors.append(float(prior))
+        self.matrix=np.vstack([self.matrix,load_log_parameters(filename)])
+        weights=np.array(self.priors)
+        self.log_priors=np.log(weights/weights.sum())
+
+    def __len__(self):
+        return len(self.names)
+
+    def log_scores(self, C):
+        '''
+        F(language) = log P(language) + sum_i X_i log p_i for every document
+        and language, with C a (docs x 26) count matrix
+
+        Returns: (docs x languages) array
+        '''
+        C=np.atleast_2d(np.asarray(C,dtype=np.float64))
+        return C@self.matrix.T+self.log_priors
+
+    def classify(self, C):
+        '''
+        Softmax of log_scores() over the languages
+
+        Returns: (docs x languages) array of posteriors P(language | X)
+        '''
+        F=self.log_scores(C)
+        F-=F.max(axis=1,keepdims=True)
+        np.exp(F,out=F)
+        F/=F.sum(axis=1,keepdims=True)
+        return F
+
+    def predict(self, C):
+        '''
+        Returns: list with the most likely language name for every document
+        '''
+        return [self.names[k] for k in np.argmax(self.log_scores(C),axis=1)]
+
+def english_posterior(f_e, f_s):
+    '''
+    P(Y=English | X) from the two scores, clamped as in the writeup so that
+    exp() never overflows
+    '''
+    if f_s-f_e>=100:
+        return 0.0
+    if f_s-f_e<=-100:
+        return 1.0
+    return 1/(1+math.exp(f_s-f_e))
+
+def log_posteriors(f_e, f_s):
+    '''
+    Normalizes the two scores into (log P(English | X), log P(Spanish | X))
+    using the log-sum-exp trick
+    '''
+    top=max(f_e,f_s)
+    norm=top+math.log(math.exp(f_e-top)+math.exp(f_s-top))
+    return (f_e-norm,f_s-norm)
+
+
+def main(filename):
+    e,s=get_parameter_vectors()
+    X=shred(filename)
+    c=counts_vector(X)
+
+    print("Q1")
+    for i in range(26):
+        print(chr(ord('A')+i),c[i])
+
+    print("Q2")
+    print("%.4f" % (c[0]*math.log(e[0])))
+    print("%.4f" % (c[0]*math.log(s[0])))
+
+    f_e,f_s=language_scores(c,e,s)
+    print("Q3")
+    print("%.4f" % f_e)
+    print("%.4f" % f_s)
+
+    print("Q4")
+    print("%.4f" % english_posterior(f_e,f_s))
 
 
-# TODO: add your code here for the assignment
-# You are free to implement it as you wish!
-# Happy Coding!
+if __name__ == '__main__':
+    main(sys.argv[1] if len(sys.argv)>1 else 'letter.txt')
@@ -0,0 +1,91 @@
+# python imports
+import os
+import sys
+import argparse
+from multiprocessing import Pool
+
+from hw2 import (get_log_parameter_vectors, shred, counts_vector,
+                 log_language_scores, log_posteriors)
+
+
+# log parameter vectors and shred backend of the current worker process,
+# set by init_worker
+_params = None
+_backend = 'python'
+
+
+def init_worker(log_e, log_s, backend='python'):
+    """store the parameter vectors once per worker instead of once per task"""
+    global _params, _backend
+    _params = (log_e, log_s)
+    _backend = backend
+
+
+def classify_file(filename):
+    """shred and score a single file inside a worker
+
+    Returns: tuple (filename, log P(English | X), log P(Spanish | X))
+    """
+    log_e, log_s = _params
+    f_e, f_s = log_language_scores(counts_vector(shred(filename, _backend)),
+                                   log_e, log_s)
+    log_e, log_s = log_posteriors(f_e, f_s)
+    return (filename, log_e, log_s)
+
+
+def expand_paths(paths):
+    """turn a list of files and directories into a flat list of files;
+    directories contribute their regular files in sorted order"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                full = os.path.join(path, name)
+                if os.path.isfile(full):
+                    files.append(full)
+        else:
+            files.append(path)
+    return files
+
+
+def classify_batch(paths, log_e=None, log_s=None, processes=None, chunksize=16,
+                   backend='python'):
+    """classify every file under paths across a process pool
+
+    Results are yielded as soon as their worker finishes, so the order
+    is not the input order.
+
+    Returns: generator of (filename, log P(English | X), log P(Spanish | X))
+    """
+    if log_e is None or log_s is None:
+        log_e, log_s = get_log_parameter_vectors()
+    files = expand_paths(paths)
+    if not files:
+        return
+
+    with Pool(processes, initializer=init_worker, initargs=(log_e, log_s, backend)) as pool:
+        for result in pool.imap_unordered(classify_file, files, chunksize):
+            yield result
+
+
+def main(args):
+    for filename, log_e, log_s in classify_batch(args.paths,
+                                                 processes=args.workers,
+                                                 chunksize=args.chunksize,
+                                                 backend=args.backend):
+        print("%s\t%.4f\t%.4f" % (filename, log_e, log_s))
+        sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Batch English/Spanish classifier')
+    parser.add_argument('paths', nargs='+', metavar='PATH',
+                        help='files or directories of letters to classify')
+    parser.add_argument('--workers', default=None, type=int,
+                        help='number of worker processes (default: all cores)')
+    parser.add_argument('--chunksize', default=16, type=int,
+                        help='files handed to a worker at a time')
+    parser.add_argument('--backend', default='python', choices=['python', 'numpy'],
+                        help='letter counting backend used by shred')
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,147 @@
+# python imports
+import os
+import sys
+import socket
+import argparse
+import numpy as np
+
+from hw2 import LanguageRegistry
+
+
+class StreamingClassifier:
+    """ Online version of the HW2 classifier: the log scores of every
+    language are updated chunk by chunk and the stream is decided as soon as
+    one language's posterior reaches the threshold.
+    """
+
+    def __init__(self, registry, threshold=0.99):
+        self.registry = registry
+        self.threshold = threshold
+        self.reset()
+
+    def reset(self):
+        self.scores = self.registry.log_priors.copy()
+        self.bytes_read = 0
+        self.decision = None
+        self.bytes_needed = None
+
+    def posterior(self, scores=None):
+        """softmax of the current (or the given rows of) log scores"""
+        F = np.atleast_2d(self.scores if scores is None else scores)
+        F = np.exp(F - F.max(axis=1, keepdims=True))
+        return F / F.sum(axis=1, keepdims=True)
+
+    def update(self, chunk):
+        """feed the next chunk of raw bytes
+
+        Returns: True once the stream has been decided
+        """
+        if self.decision is not None:
+            return True
+
+        data = np.frombuffer(chunk, dtype=np.uint8)
+        # fold case and keep only the positions of the 26 letters
+        upper = data & 0xDF
+        pos = np.flatnonzero((upper >= ord('A')) & (upper <= ord('Z')))
+        if len(pos) == 0:
+            self.bytes_read += len(data)
+            return False
+
+        # running scores after every letter of the chunk, so the exact
+        # byte where the threshold is crossed can be reported
+        steps = self.registry.matrix[:, upper[pos] - ord('A')].T
+        running = self.scores + np.cumsum(steps, axis=0)
+        decided = np.flatnonzero(self.posterior(running).max(axis=1) >= self.threshold)
+
+        if len(decided) == 0:
+            self.scores = running[-1]
+            self.bytes_read += len(data)
+            return False
+
+        k = decided[0]
+        self.scores = running[k]
+        self.bytes_needed = self.bytes_read + int(pos[k]) + 1
+        self.bytes_read += len(data)
+        self.decision = self.registry.names[int(np.argmax(self.scores))]
+        return True
+
+    def result(self):
+        """(language, posterior, bytes needed to decide); when the stream
+        ended undecided the most likely language is reported together with
+        the total number of bytes read"""
+        posterior = self.posterior()[0]
+        k = int(np.argmax(posterior))
+        needed = self.bytes_needed if self.decision is not None else self.bytes_read
+        return (self.registry.names[k], float(posterior[k]), needed)
+
+
+def classify_stream(read, registry, threshold=0.99, chunk_size=256):
+    """pull chunks from read(chunk_size) until a decision is reached or the
+    stream ends (read returns b'')
+
+    Returns: tuple (language, posterior, bytes needed to decide, decided)
+    """
+    classifier = StreamingClassifier(registry, threshold)
+    while True:
+        chunk = read(chunk_size)
+        if not chunk:
+            break
+        if classifier.update(chunk):
+            break
+    return classifier.result() + (classifier.decision is not None,)
+
+
+def format_result(result):
+    language, posterior, needed, decided = result
+    return "%s\t%.4f\t%d\t%s" % (language, posterior, needed,
+                                 "decided" if decided else "undecided")
+
+
+def serve(sock, registry, args):
+    """answer one message per connection with its result line; a client
+    that resets or drops its connection only loses its own answer"""
+    while True:
+        conn, _ = sock.accept()
+        with conn:
+            try:
+                result = classify_stream(conn.recv, registry, args.threshold, args.chunk_size)
+                conn.sendall((format_result(result) + "\n").encode('utf-8'))
+            except OSError as e:
+                print("connection dropped: %s" % e, file=sys.stderr)
+
+
+def main(args):
+    if args.languages:
+        registry = LanguageRegistry.from_files(args.languages)
+    else:
+        registry = LanguageRegistry.from_files(['e.txt', 's.txt'], {'e': 0.6, 's': 0.4})
+
+    if args.unix_socket is not None:
+        if os.path.exists(args.unix_socket):
+            os.remove(args.unix_socket)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.bind(args.unix_socket)
+            sock.listen()
+            serve(sock, registry, args)
+    elif args.port is not None:
+        with socket.create_server(('127.0.0.1', args.port)) as sock:
+            serve(sock, registry, args)
+    else:
+        result = classify_stream(sys.stdin.buffer.read1, registry, args.threshold, args.chunk_size)
+        print(format_result(result))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Streaming early-exit language classifier')
+    parser.add_argument('--threshold', default=0.99, type=float,
+                        help='posterior at which a language is accepted')
+    parser.add_argument('--chunk-size', default=256, type=int,
+                        help='maximum bytes read per update')
+    parser.add_argument('--languages', nargs='+', metavar='FILE',
+                        help='<lang>.txt parameter tables (default: e.txt s.txt)')
+    parser.add_argument('--unix-socket', default=None, metavar='PATH',
+                        help='serve on a unix domain socket instead of stdin')
+    parser.add_argument('--port', default=None, type=int,
+                        help='serve on 127.0.0.1:PORT instead of stdin')
+    args = parser.parse_args()
+    main(args)
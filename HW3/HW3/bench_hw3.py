@@ -0,0 +1,160 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+import numpy as np
+
+import hw3
+
+
+def flops_covariance(n, d):
+    # X^T X, only counting the multiply-adds of the GEMM
+    return 2.0 * n * d * d
+
+
+def flops_eig(n, d):
+    # dense symmetric eigendecomposition with eigenvectors, ~9 d^3 in LAPACK's syevr/syevd
+    return 9.0 * d ** 3
+
+
+def flops_project(n, d, m=10):
+    # U^T x followed by U (U^T x)
+    return 4.0 * d * m
+
+
+def measure(fn, repeats, setup=None):
+    """run fn repeats times and return (best wall time, peak traced memory in bytes). The timed runs have
+        tracemalloc off, since tracing slows every allocation; the peak comes from one extra traced run."""
+    best = float('inf')
+    for i in range(repeats):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def bench_dataset(name, filename, repeats, m, prop):
+    """benchmark every HW3 function on one .npy dataset"""
+    results = []
+    raw = np.load(filename, mmap_mode='r')
+    n, d = len(raw), int(np.prod(raw.shape[1:]))
+    X = hw3.load_and_center_dataset(filename)
+    S = hw3.get_covariance(X)
+    _, U = hw3.get_eig(S, m)
+    image = X[0]
+
+    def record(function, seconds, peak, flops):
+        results.append({
+            "dataset": name, "n": n, "d": d, "function": function,
+            "seconds": seconds, "peak_bytes": peak,
+            "gflops": (flops / seconds / 1e9) if flops and seconds > 0 else None,
+        })
+
+    seconds, peak = measure(lambda: hw3.load_and_center_dataset(filename), repeats)
+    record("load_and_center_dataset", seconds, peak, None)
+
+    seconds, peak = measure(lambda: hw3.get_covariance(X), repeats)
+    record("get_covariance", seconds, peak, flops_covariance(n, d))
+
+    # the eigendecomposition is memoized, so clear the cache to time the real solve
+    seconds, peak = measure(lambda: hw3.get_eig(S, m), repeats, setup=hw3.EIG_CACHE.clear)
+    record("get_eig", seconds, peak, flops_eig(n, d))
+
+    seconds, peak = measure(lambda: hw3.get_eig(S, m), repeats)
+    record("get_eig (cached)", seconds, peak, None)
+
+    seconds, peak = measure(lambda: hw3.get_eig_prop(S, prop), repeats, setup=hw3.EIG_CACHE.clear)
+    record("get_eig_prop", seconds, peak, flops_eig(n, d))
+
+    if d == 32 * 32:
+        seconds, peak = measure(lambda: hw3.project_image(image, U), repeats)
+        record("project_image", seconds, peak, flops_project(n, d, m))
+
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """attach the baseline time and speedup to every result; returns the regressed entries"""
+    index = {(r["dataset"], r["function"]): r for r in baseline}
+    regressions = []
+    for r in results:
+        base = index.get((r["dataset"], r["function"]))
+        if base is None:
+            continue
+        r["baseline_seconds"] = base["seconds"]
+        r["speedup"] = base["seconds"] / r["seconds"] if r["seconds"] > 0 else None
+        if r["seconds"] > base["seconds"] * (1 + tolerance):
+            regressions.append(r)
+    return regressions
+
+
+def main(args):
+    results = []
+    rng = np.random.default_rng(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.n:
+            for d in args.d:
+                filename = os.path.join(tmp, "synthetic_%d_%d.npy" % (n, d))
+                np.save(filename, rng.integers(0, 256, size=(n, d), dtype=np.uint8))
+                results += bench_dataset("synthetic_%dx%d" % (n, d), filename,
+                                         args.repeats, args.m, args.prop)
+
+    if args.real and os.path.exists(args.real):
+        results += bench_dataset(os.path.basename(args.real), args.real,
+                                 args.repeats, args.m, args.prop)
+
+    regressions = []
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)["results"], args.tolerance)
+
+    report = {"numpy": np.__version__, "repeats": args.repeats, "results": results,
+              "regressions": [(r["dataset"], r["function"]) for r in regressions]}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump({"results": results}, f, indent=2)
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='HW3 PCA benchmark suite')
+    parser.add_argument('--n', nargs='+', type=int, default=[2000],
+                        help='rows of the synthetic datasets')
+    parser.add_argument('--d', nargs='+', type=int, default=[256, 1024],
+                        help='columns of the synthetic datasets')
+    parser.add_argument('--real', default='YaleB_32x32.npy',
+                        help='real dataset to include (skipped if missing)')
+    parser.add_argument('--m', default=10, type=int, help='components for get_eig/project_image')
+    parser.add_argument('--prop', default=0.07, type=float, help='proportion for get_eig_prop')
+    parser.add_argument('--repeats', default=3, type=int, help='runs per function, the best is kept')
+    parser.add_argument('--seed', default=0, type=int)
+    parser.add_argument('--output', default=None, help='write the JSON report here instead of stdout')
+    parser.add_argument('--baseline', default=None, help='baseline JSON to compare against')
+    parser.add_argument('--save-baseline', default=None, help='store these results as a new baseline')
+    parser.add_argument('--tolerance', default=0.10, type=float,
+                        help='allowed slowdown against the baseline before it counts as a regression')
+    args = parser.parse_args()
+    sys.exit(main(args))
@@ -0,0 +1,44 @@
+import time
+import argparse
+import numpy as np
+
+from hw3 import get_covariance, get_eig, get_eig_randomized
+
+
+def synthetic_faces(n, d, rank=50, seed=0):
+    """centered n × d data with a decaying spectrum, like the face images"""
+    rng = np.random.default_rng(seed)
+    basis = rng.standard_normal((rank, d))
+    weights = rng.standard_normal((n, rank)) * (1.0 / np.arange(1, rank + 1))
+    x = np.dot(weights, basis) + 0.01 * rng.standard_normal((n, d))
+    return x - np.mean(x, axis = 0)
+
+
+def main(args):
+    print("%6s %6s %10s %10s %12s %12s" % ("n", "d", "eigh s", "rsvd s", "max rel err", "min |cos|"))
+    for d in args.dims:
+        x = synthetic_faces(args.n, d)
+
+        start = time.perf_counter()
+        Lambda, U = get_eig(get_covariance(x), args.m)
+        t_eigh = time.perf_counter() - start
+
+        start = time.perf_counter()
+        Lambda_r, U_r = get_eig_randomized(x, args.m, seed=args.seed)
+        t_rsvd = time.perf_counter() - start
+
+        rel_err = np.max(np.abs(np.diag(Lambda_r) - np.diag(Lambda)) / np.diag(Lambda))
+        # eigenvectors are only defined up to sign
+        cos = np.min(np.abs(np.sum(U * U_r, axis = 0)))
+        print("%6d %6d %10.4f %10.4f %12.2e %12.6f" % (args.n, d, t_eigh, t_rsvd, rel_err, cos))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='randomized SVD vs eigh for get_eig')
+    parser.add_argument('--n', default=2414, type=int, help='number of images')
+    parser.add_argument('--m', default=10, type=int, help='number of components')
+    parser.add_argument('--seed', default=0, type=int)
+    parser.add_argument('--dims', nargs='+', type=int, default=[1024, 2304, 4096],
+                        help='image dimensions to benchmark')
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,61 @@
+import numpy as np
+
+from hw3 import get_covariance, get_eig
+
+
+class EigenfaceIndex:
+    """Nearest-neighbour search over faces in the eigenspace of HW3. The gallery is stored as its PCA
+        coefficients in one contiguous float32 array, and queries are answered in blocks with a single
+        matrix multiply for the distances and argpartition for the k best."""
+
+    def __init__(self, U, gallery, block_size=1024):
+        # Parameter: U(d × m eigenvectors from get_eig)
+        # Parameter: gallery(n × d centered faces to index)
+        # Parameter: block_size(queries handled per block, caps the block × n distance matrix)
+        self.U = np.ascontiguousarray(U, dtype=np.float32)
+        self.block_size = block_size
+        gallery = np.reshape(np.asarray(gallery, dtype=np.float32), (len(gallery), -1))
+        # only the coefficients are needed, not the n × d reconstruction
+        self.coeffs = np.ascontiguousarray(np.dot(gallery, self.U))
+        self.sq_norms = np.einsum('ij,ij->i', self.coeffs, self.coeffs)
+
+    @classmethod
+    def build(cls, dataset, m, block_size=1024):
+        # index a centered dataset in the eigenspace of its own top m components
+        _, U = get_eig(get_covariance(dataset), m)
+        return cls(U, dataset, block_size)
+
+    def __len__(self):
+        return len(self.coeffs)
+
+    def query(self, images, k=1):
+        """This method will return the indices of the k nearest gallery faces of every query image and their
+            (Euclidean, in coefficient space) distances, both as q × k arrays sorted by distance."""
+
+        images = np.asarray(images, dtype=np.float32)
+        images = np.reshape(images, (len(images), -1))
+        k = min(k, len(self.coeffs))
+        indices = np.empty((len(images), k), dtype=np.int64)
+        distances = np.empty((len(images), k), dtype=np.float32)
+
+        for start in range(0, len(images), self.block_size):
+            block = np.dot(images[start:start + self.block_size], self.U)
+            # |a - b|^2 = |a|^2 + |b|^2 - 2 a.b for the whole block at once
+            d2 = np.dot(block, np.transpose(self.coeffs))
+            d2 *= -2
+            d2 += self.sq_norms
+            d2 += np.einsum('ij,ij->i', block, block)[:, None]
+            np.maximum(d2, 0, out=d2)
+
+            rows = np.arange(len(block))[:, None]
+            if k < d2.shape[1]:
+                best = np.argpartition(d2, k - 1, axis=1)[:, :k]
+            else:
+                best = np.broadcast_to(np.arange(k), (len(block), k))
+            order = np.argsort(d2[rows, best], axis=1)
+            best = best[rows, order]
+
+            indices[start:start + len(block)] = best
+            distances[start:start + len(block)] = np.sqrt(d2[rows, best])
+
+        return indices, distances
@@ -1,25 +1,135 @@
+from collections import OrderedDict
+import hashlib
 from scipy.linalg import eigh
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 
-def load_and_center_dataset(filename):
+# full eigendecompositions already computed, keyed by a hash of the covariance matrix and kept in LRU order
+EIG_CACHE = OrderedDict()
+EIG_CACHE_SIZE = 8
+
+def load_and_center_dataset(filename, dtype=np.float32, return_mean=False):
     """This function will load the data from the file center it around the 
-        center and return it as an array of floats"""
+        center and return it as an array of floats. The data is converted to dtype once and centered in
+        place, so no second full-size copy is made; with return_mean the mean vector is returned as well
+        so images can be reconstructed later."""
 
     # parameters: filename              
+    # parameters: dtype(float type of the returned array, float32 halves memory and uses single-precision GEMM)
+    # parameters: return_mean(also return the mean that was subtracted)
+
+    # np.load returns a fresh array, so it can be converted (if needed) and centered in place
+    x = np.load(filename).astype(dtype, copy=False)
+    # accumulate the mean in float64 so single precision does not lose accuracy over many rows
+    mean = np.mean(x, axis = 0, dtype=np.float64).astype(dtype)
+    x -= mean
+    if return_mean:
+        return x, mean
+    return x
+
+
+def load_dataset_blocks(filename, block_rows=256):
+    """This method will memory-map the .npy file and yield it as float64 (rows × d) blocks of at most
+        block_rows rows, so only one block of the dataset is ever held in memory. An image stack such as
+        (n, 32, 32) is flattened to d = 1024 columns per row."""
+
+    # parameters: filename, block_rows
+
+    x = np.load(filename, mmap_mode='r')
+    d = int(np.prod(x.shape[1:]))
+    for start in range(0, len(x), block_rows):
+        block = np.asarray(x[start:start + block_rows], dtype=np.float64)
+        yield np.reshape(block, (len(block), d))
+
+
+class IncrementalPCA:
+    """Running mean and scatter matrix of a dataset that is seen one block of rows at a time. Blocks are
+        merged with the pairwise (Chan et al.) update, so covariance() always equals get_covariance of the
+        whole dataset centered at once, and new batches can be folded into a saved model later."""
+
+    def __init__(self, d):
+        self.n = 0
+        self.mean = np.zeros(d)
+        self.scatter = np.zeros((d, d))
+
+    def partial_fit(self, block):
+        # fold an (rows × d) block into the running statistics
+        block = np.asarray(block, dtype=np.float64)
+        if len(block) == 0:
+            return self
+        n_b = len(block)
+        mean_b = np.mean(block, axis = 0)
+        centered = block - mean_b
+
+        delta = mean_b - self.mean
+        n = self.n + n_b
+        self.scatter += np.dot(np.transpose(centered), centered)
+        self.scatter += np.outer(delta, delta) * (self.n * n_b / n)
+        self.mean += delta * (n_b / n)
+        self.n = n
+        return self
 
-    x = np.load(filename)
-    return x - np.mean(x, axis = 0)
+    def fit_npy(self, filename, block_rows=256):
+        # stream a (possibly larger than memory) .npy file into the model
+        for block in load_dataset_blocks(filename, block_rows):
+            self.partial_fit(block)
+        return self
 
+    def covariance(self):
+        return self.scatter
+
+    def eig(self, m):
+        return get_eig(self.scatter, m)
+
+    def save(self, filename):
+        np.savez(filename, n=self.n, mean=self.mean, scatter=self.scatter)
+
+    @classmethod
+    def load(cls, filename):
+        with np.load(filename) as data:
+            model = cls(len(data['mean']))
+            model.n = int(data['n'])
+            model.mean = data['mean'].copy()
+            model.scatter = data['scatter'].copy()
+        return model
 
 def get_covariance(dataset):
     """This method will calculate and return the covariance matrix of the dataset as a numpy
-        matrix (d × d array). """
+        matrix (d × d array). The product runs in the dataset's own dtype, so a float32 dataset
+        uses single-precision BLAS. """
 
     # Parameter: dataset
     
     return np.dot(np.transpose(dataset), dataset)
 
+def get_full_eig(S):
+    """This method will return all eigenvalues of S in descending order and the matching eigenvectors as
+        columns. The decomposition is done once per distinct S and then served from EIG_CACHE, evicting
+        the least recently used entry beyond EIG_CACHE_SIZE. The returned arrays are read-only."""
+
+    # Parameter: S(covariance matrix)
+    S = np.ascontiguousarray(S)
+    digest = hashlib.blake2b(S.view(np.uint8), digest_size=16)
+    digest.update(repr((S.shape, S.dtype.str)).encode())
+    key = digest.hexdigest()
+
+    if key in EIG_CACHE:
+        EIG_CACHE.move_to_end(key)
+        return EIG_CACHE[key]
+
+    eigenvalues, eigenvectors = eigh(S)
+    eigenvalues = eigenvalues[::-1].copy()
+    eigenvectors = eigenvectors[:, ::-1].copy()
+    eigenvalues.setflags(write=False)
+    eigenvectors.setflags(write=False)
+
+    EIG_CACHE[key] = (eigenvalues, eigenvectors)
+    while len(EIG_CACHE) > EIG_CACHE_SIZE:
+        EIG_CACHE.popitem(last=False)
+    return eigenvalues, eigenvectors
+
 def get_eig(S, m):
     """This method will perform eigendecomposition on the covariance matrix S and return a diagonal matrix
         (numpy array) with the largest m eigenvalues on the diagonal in descending order, and a matrix (numpy
@@ -27,21 +137,57 @@ def get_eig(S, m):
 
     # Parameter: S(covariance matrix)
     # Patameter: m(number of eigenvalues)
-    eigenvalues, eigenvectors = eigh(S, subset_by_index=[len(S)-m,len(S)-1])
-    idx = np.argsort(eigenvalues)
-    idx = idx[::-1]
-    eigenvectors = eigenvectors[:, idx]
-    eigenvalues = eigenvalues[idx]
+    eigenvalues, eigenvectors = get_full_eig(S)
+    # a writable d × m copy, so the caller neither edits nor pins the cached d × d matrix
+    return np.diag(eigenvalues[:m]), eigenvectors[:, :m].copy()
+
+def get_eig_randomized(dataset, m, oversample=10, n_iter=4, seed=0):
+    """This method will compute the largest m eigenvalues and eigenvectors of get_covariance(dataset)
+        straight from the centered dataset with a randomized truncated SVD, without ever building the
+        d × d covariance matrix. It returns the same diagonal matrix and eigenvector matrix as get_eig."""
+
+    # Parameter: dataset(centered n × d data)
+    # Parameter: m(number of eigenvalues)
+    # Parameter: oversample(extra random directions for the range finder)
+    # Parameter: n_iter(power iterations, sharpen the spectrum when it decays slowly)
+    # Parameter: seed(makes the random test matrix reproducible)
+    rng = np.random.default_rng(seed)
+    k = min(m + oversample, min(dataset.shape))
+
+    # range finder: orthonormal basis for the span of dataset @ omega
+    omega = rng.standard_normal((dataset.shape[1], k)).astype(dataset.dtype, copy=False)
+    Q, _ = np.linalg.qr(np.dot(dataset, omega))
+    for i in range(n_iter):
+        Q, _ = np.linalg.qr(np.dot(np.transpose(dataset), Q))
+        Q, _ = np.linalg.qr(np.dot(dataset, Q))
+
+    # the right singular vectors of the small k × d matrix are the eigenvectors of X^T X
+    _, sigma, Vt = np.linalg.svd(np.dot(np.transpose(Q), dataset), full_matrices=False)
+    eigenvalues = sigma[:m] ** 2
+    eigenvectors = np.transpose(Vt[:m])
     return np.diag(eigenvalues), eigenvectors
 
 def get_eig_prop(S, prop):
-    """This method is used to extract eigenvalues and eigenvectors"""
-    eigenvalues, eigenvectors = eigh(S, subset_by_value=[len(S)-prop,len(S)-1])
-    idx = np.argsort(eigenvalues)
-    idx = idx[::-1]
-    eigenvectors = eigenvectors[:, idx]
-    eigenvalues = eigenvalues[idx]
-    return np.diag(eigenvalues), eigenvectors
+    """This method is used to extract eigenvalues and eigenvectors: like get_eig, but it returns every
+        eigenvalue that on its own explains more than a prop proportion of the variance."""
+
+    # Parameter: S(covariance matrix)
+    # Parameter: prop(proportion of the total variance)
+    eigenvalues, eigenvectors = get_full_eig(S)
+    # the spectrum is sorted descending, so the eigenvalues above prop * total form a prefix
+    m = len(eigenvalues) - np.searchsorted(eigenvalues[::-1], prop * np.sum(eigenvalues), side='right')
+    return np.diag(eigenvalues[:m]), eigenvectors[:, :m].copy()
+
+def get_eig_cumulative(S, prop):
+    """This method will return the smallest number of leading eigenvalues (and their eigenvectors) that
+        together explain at least a prop proportion of the variance, found with a cumulative-sum search."""
+
+    # Parameter: S(covariance matrix)
+    # Parameter: prop(proportion of the total variance)
+    eigenvalues, eigenvectors = get_full_eig(S)
+    explained = np.cumsum(eigenvalues)
+    m = min(int(np.searchsorted(explained, prop * explained[-1], side='left')) + 1, len(eigenvalues))
+    return np.diag(eigenvalues[:m]), eigenvectors[:, :m].copy()
 
 def project_image(image, U):
     # This method will return the projection of the given image
@@ -51,6 +197,32 @@ def project_image(image, U):
     
     return projection
 
+def project_images(images, U, out=None, coeffs_out=None):
+    """This method will project a whole batch of images onto the columns of U and reconstruct them, using
+        two matrix multiplies for the batch. images is an (n × d) block or an (n, ...) stack of images of
+        any shape; the reconstructions come back in the same shape. Unlike project_image, the result is
+        the plain projection U U^T x, without rescaling by the image mean."""
+
+    # Parameter: images(n images, flattened or not)
+    # Parameter: U(d × m eigenvectors as columns)
+    # Parameter: out(optional buffer of images' shape for the reconstructions)
+    # Parameter: coeffs_out(optional n × m buffer for the coefficients)
+    images = np.asarray(images)
+    flat = np.reshape(images, (len(images), -1))
+    if coeffs_out is None:
+        coeffs_out = np.empty((len(flat), U.shape[1]), dtype=np.result_type(flat, U))
+    if out is None:
+        out = np.empty(images.shape, dtype=coeffs_out.dtype)
+
+    out_flat = np.reshape(out, flat.shape)
+    if not np.shares_memory(out_flat, out):
+        raise ValueError("out must be viewable as an (n × d) block without a copy")
+
+    # matmul writes straight into the buffers, nothing else is allocated
+    np.matmul(flat, U, out=coeffs_out)
+    np.matmul(coeffs_out, np.transpose(U), out=out_flat)
+    return coeffs_out, out
+
 def display_image(orig, proj):
     # This method will create the 2 subplots of original and projected image
 
@@ -60,3 +232,61 @@ def display_image(orig, proj):
     a = ax1.imshow(np.transpose(np.reshape(orig,(32,32))), aspect='equal')
     c = ax2.imshow(np.transpose(proj), aspect='equal')
     plt.show()
+
+
+class MontageRenderer:
+    """Headless replacement for display_image: many original/projection pairs are tiled side by side into
+        one mosaic and written to a PNG with the Agg canvas, without pyplot or a window. The figure and its
+        single image artist are created once and reused for every render of the same grid size."""
+
+    def __init__(self, cols=10, shape=(32, 32), pad=1, scale=4, dpi=100):
+        self.cols = cols
+        self.shape = shape
+        self.pad = pad
+        self.scale = scale
+        self.dpi = dpi
+        self.figure = Figure()
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.axes = self.figure.add_axes([0, 0, 1, 1])
+        self.axes.set_axis_off()
+        self.artist = None
+
+    def tile(self, origs, projs):
+        # mosaic of (original | projection) cells, each image transposed and scaled to [0, 1] on its own
+        # like display_image shows them; the padding between cells is left at NaN (drawn blank)
+        h, w = self.shape
+        origs = np.reshape(np.asarray(origs, dtype=np.float32), (-1, h, w))
+        projs = np.reshape(np.asarray(projs, dtype=np.float32), (-1, h, w))
+        images = np.stack([origs, projs], axis=1).transpose(0, 1, 3, 2)
+
+        low = images.min(axis=(2, 3), keepdims=True)
+        span = images.max(axis=(2, 3), keepdims=True) - low
+        images = (images - low) / np.where(span > 0, span, 1)
+
+        n = len(images)
+        rows = (n + self.cols - 1) // self.cols
+        cell_h, cell_w = w + self.pad, 2 * h + 2 * self.pad
+        mosaic = np.full((rows * cell_h, self.cols * cell_w), np.nan, dtype=np.float32)
+        for i in range(n):
+            r, c = divmod(i, self.cols)
+            top, left = r * cell_h, c * cell_w
+            mosaic[top:top + w, left:left + h] = images[i, 0]
+            mosaic[top:top + w, left + h + self.pad:left + 2 * h + self.pad] = images[i, 1]
+        return mosaic
+
+    def render(self, origs, projs, filename):
+        mosaic = self.tile(origs, projs)
+        if self.artist is None or self.artist.get_array().shape != mosaic.shape:
+            # scale output pixels per mosaic pixel
+            self.figure.set_size_inches(mosaic.shape[1] * self.scale / self.dpi,
+                                        mosaic.shape[0] * self.scale / self.dpi)
+            if self.artist is None:
+                self.artist = self.axes.imshow(mosaic, aspect='equal', interpolation='nearest',
+                                               vmin=0, vmax=1)
+        self.artist.set_data(mosaic)
+        self.artist.set_extent((-0.5, mosaic.shape[1] - 0.5, mosaic.shape[0] - 0.5, -0.5))
+        self.figure.savefig(filename, dpi=self.dpi)
+
+def save_montage(origs, projs, filename, cols=10, shape=(32, 32)):
+    # This method will write all original/projection pairs to one PNG, see MontageRenderer
+    MontageRenderer(cols, shape).render(origs, projs, filename)
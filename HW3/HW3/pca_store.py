@@ -0,0 +1,96 @@
+import os
+import json
+import numpy as np
+
+from hw3 import IncrementalPCA, load_dataset_blocks
+
+
+class PCAStore:
+    """Compressed face dataset built on the HW3 PCA. A store is a directory holding the mean image, the top-k
+        eigenvectors and the k coefficients of every image; the coefficient file is memory-mapped, so any
+        range of images can be decoded without reading the rest of the dataset."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self.shape = tuple(self.meta['shape'])
+        self.mean = np.load(os.path.join(path, 'mean.npy')).astype(np.float32)
+        # the basis is small (d × k), keep it in memory in the precision used for decoding
+        self.basis = np.load(os.path.join(path, 'basis.npy')).astype(np.float32)
+        self.coeffs = np.load(os.path.join(path, 'coeffs.npy'), mmap_mode='r')
+
+    def __len__(self):
+        return len(self.coeffs)
+
+    def decode(self, start=0, stop=None, out=None):
+        """This method will reconstruct images start..stop-1 as an (n, *shape) float32 array, reading only
+            their rows of the coefficient file."""
+
+        return self._reconstruct(self.coeffs[start:stop], out)
+
+    def _reconstruct(self, coeffs, out=None):
+        # coeffs may be any (strided, reversed or empty) view of the coefficient file
+        coeffs = np.asarray(coeffs, dtype=np.float32)
+        if out is None:
+            out = np.empty((len(coeffs),) + self.shape, dtype=np.float32)
+        flat = np.reshape(out, (len(coeffs), self.meta['d']))
+        np.matmul(coeffs, np.transpose(self.basis), out=flat)
+        flat += self.mean
+        return out
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            # only the selected rows are read and decoded, in the slice's order
+            return self._reconstruct(self.coeffs[index])
+        index = range(len(self))[index]
+        return self.decode(index, index + 1)[0]
+
+    def nbytes(self):
+        # bytes on disk of the whole store
+        return sum(os.path.getsize(os.path.join(self.path, name)) for name in os.listdir(self.path))
+
+
+def compress(filename, path, k, basis_dtype=np.float16, coeff_dtype=np.float16, block_rows=1024):
+    """This method will compress the .npy dataset in filename into a PCAStore directory at path, keeping k
+        components. The dataset is streamed twice through a memory map (once for the mean and covariance,
+        once for the coefficients), so it never has to fit in memory."""
+
+    # Parameter: filename(.npy file of n images)
+    # Parameter: path(directory of the new store)
+    # Parameter: k(number of components kept)
+    # Parameter: basis_dtype, coeff_dtype(float16 or float32 storage precision)
+    # Parameter: block_rows(rows streamed per block)
+    raw = np.load(filename, mmap_mode='r')
+    n, shape = len(raw), raw.shape[1:]
+    d = int(np.prod(shape))
+    del raw
+
+    model = IncrementalPCA(d)
+    for block in load_dataset_blocks(filename, block_rows):
+        model.partial_fit(block)
+    _, U = model.eig(k)
+
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, 'mean.npy'), model.mean.astype(np.float32))
+    np.save(os.path.join(path, 'basis.npy'), U.astype(basis_dtype))
+    # project with the stored (rounded) basis so decoding reproduces the best fit for it
+    U = U.astype(basis_dtype).astype(np.float64)
+
+    coeffs = np.lib.format.open_memmap(os.path.join(path, 'coeffs.npy'), mode='w+',
+                                       dtype=coeff_dtype, shape=(n, k))
+    start = 0
+    for block in load_dataset_blocks(filename, block_rows):
+        block = np.dot(block - model.mean, U)
+        if np.abs(block).max(initial=0) > np.finfo(coeff_dtype).max:
+            raise ValueError("coefficients overflow %s, store them as float32" % np.dtype(coeff_dtype).name)
+        coeffs[start:start + len(block)] = block
+        start += len(block)
+    coeffs.flush()
+    del coeffs
+
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump({'n': n, 'd': d, 'k': k, 'shape': list(shape),
+                   'basis_dtype': np.dtype(basis_dtype).name,
+                   'coeff_dtype': np.dtype(coeff_dtype).name}, f, indent=2)
+    return PCAStore(path)
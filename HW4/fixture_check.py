@@ -0,0 +1,46 @@
+import os
+import re
+import argparse
+import numpy as np
+
+import hw4
+
+
+#the expected Z in the "Solution:" part of an output/ fixture; a Z of n-1
+#rows comes from hac over the first n Pokemon
+def readSolution(path):
+    with open(path) as f:
+        text = f.read()
+    rows = re.findall(r'\[\s*([^\[\]]+?)\]', text.split('Solution:')[1])
+    return np.array([[float(v) for v in row.split()] for row in rows])
+
+
+#run every hac mode on the rows each fixture was made from and compare with
+#its Z: ids and sizes exactly, distances up to the 8 decimals printed
+def main(args):
+    rows = hw4.load_data(args.csv)
+    failed = False
+    for name in args.fixtures:
+        expected = readSolution(os.path.join(args.output, name))
+        n = len(expected) + 1
+        features = [hw4.calc_features(row) for row in rows[:n]]
+        for mode in args.modes:
+            Z = hw4.hac(features, mode)
+            same = Z.shape == expected.shape and np.array_equal(Z[:, [0, 1, 3]], expected[:, [0, 1, 3]])
+            err = np.max(np.abs(Z[:, 2] - expected[:, 2])) if same else np.inf
+            ok = same and err < 1e-6
+            failed = failed or not ok
+            print("%-17s n=%3d %-15s ids/sizes %-5s max height error %.2e  %s"
+                  % (name, n, mode, same, err, "ok" if ok else "MISMATCH"))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='check every hw4.hac mode against the output/ fixtures')
+    parser.add_argument('--csv', default='Pokemon.csv')
+    parser.add_argument('--output', default='output', help='directory holding the fixtures')
+    parser.add_argument('--fixtures', nargs='+', default=['hac.txt', 'hac_full.txt', 'hac_tiebreak.txt'])
+    parser.add_argument('--modes', nargs='+', default=['scan', 'heap', 'lance-williams'],
+                        choices=['scan', 'heap', 'lance-williams'])
+    args = parser.parse_args()
+    raise SystemExit(main(args))
@@ -0,0 +1,61 @@
+import time
+import argparse
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+import hw4
+
+
+#random feature rows in the value range of the Pokemon stats
+def randomFeatures(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.integers(1, 256, size=(n, 6)).astype(np.int64)
+
+
+def main(args):
+    results = {mode: [] for mode in args.modes}
+    for n in args.sizes:
+        features = randomFeatures(n, args.seed)
+        for mode in args.modes:
+            if n > args.limits.get(mode, n):
+                continue
+            start = time.perf_counter()
+            distances = hw4.getCondensedDistances(features)
+            if mode == 'lance-williams':
+                #the matrix is private to this run, let the engine overwrite it
+                hw4.linkageCore(distances, n, hw4.completeUpdate)
+            else:
+                hw4.hac(features, mode, distances)
+            elapsed = time.perf_counter() - start
+            del distances
+            results[mode].append((n, elapsed))
+            print("%-15s n=%6d %10.3f s" % (mode, n, elapsed), flush=True)
+
+    fig, ax = plt.subplots()
+    for mode, points in results.items():
+        if points:
+            ax.plot([p[0] for p in points], [p[1] for p in points], marker='o', label=mode)
+    ax.set_xscale('log')
+    ax.set_yscale('log')
+    ax.set_xlabel('points n')
+    ax.set_ylabel('seconds')
+    ax.set_title('complete-linkage hac scaling')
+    ax.legend()
+    fig.savefig(args.output, dpi=120)
+    print("wrote", args.output)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='time hw4.hac modes over growing n and plot them')
+    parser.add_argument('--sizes', nargs='+', type=int,
+                        default=[100, 200, 500, 1000, 2000, 5000, 10000, 20000])
+    parser.add_argument('--modes', nargs='+', default=['scan', 'heap', 'lance-williams'],
+                        choices=['scan', 'heap', 'lance-williams'])
+    parser.add_argument('--seed', default=0, type=int)
+    parser.add_argument('--output', default='hac_scaling.png')
+    args = parser.parse_args()
+    #the slower modes are only run up to the size they finish in reasonable time
+    args.limits = {'scan': 200, 'heap': 2000}
+    main(args)
@@ -1,27 +1,84 @@
+import os
 import csv
+import json
+import heapq
+import hashlib
+import tempfile
+from array import array
 import numpy as np
+from multiprocessing import Pool
 from math import inf
 from scipy.cluster import hierarchy
 import matplotlib.pyplot as plt
 from scipy.cluster.hierarchy import dendrogram, linkage
 
+##Cluster Membership##
+#Which points belong to which cluster, for all clusters at once, in O(n)
+#memory: a union-find forest (parent, union by size) gives the cluster root
+#of any point through find, and a circular linked list through next chains
+#the members of every root so they can be listed. Merging two clusters is a
+#union plus an O(1) splice of their lists, no point sets are copied.
+class ClusterMembership:
+    __slots__ = ('parent', 'next', 'size')
+
+    def __init__(self, n) -> None:
+        self.parent = array('q', range(n))
+        self.next = array('q', range(n))
+        self.size = array('q', [1]) * n
+
+    #root of the cluster holding point, halving the path on the way up
+    def find(self, point):
+        parent = self.parent
+        while parent[point] != point:
+            parent[point] = parent[parent[point]]
+            point = parent[point]
+        return point
+
+    #merge the clusters rooted at root1 and root2, returns the new root
+    def union(self, root1, root2):
+        if self.size[root1] < self.size[root2]:
+            root1, root2 = root2, root1
+        self.parent[root2] = root1
+        self.size[root1] += self.size[root2]
+        self.next[root1], self.next[root2] = self.next[root2], self.next[root1]
+        return root1
+
+    def members(self, root):
+        point = root
+        while True:
+            yield point
+            point = self.next[point]
+            if point == root:
+                return
+
 ##Cluster Class##
+#A cluster is only its id, size and the root of its points in the shared
+#ClusterMembership; points lists them on demand and `point in cluster` is a
+#find on the membership.
 class Cluster:
-    id = -1
-    points = set([])
-    numPoints = 0
+    __slots__ = ('id', 'root', 'numPoints', 'membership')
 
-    def __init__(self, id, points, numPoints) -> None:
+    def __init__(self, id, root, numPoints, membership) -> None:
         self.id = id
-        self.points = points
+        self.root = root
         self.numPoints = numPoints
-        pass
+        self.membership = membership
+
+    @property
+    def points(self):
+        return self.membership.members(self.root)
+
+    def __contains__(self, point):
+        return self.membership.find(point) == self.root
+
+    def __len__(self):
+        return self.numPoints
 
     def __eq__(self, __o: object) -> bool:
         return self.id == __o.id
 
     def __hash__(self) -> int:
-        return hash(repr(self))
+        return hash(self.id)
 
 #Loads data in from file. outputs as array of dicts
 def load_data(filepath):
@@ -45,26 +102,116 @@ def calc_features(row):
     arr[5] = int(row["HP"])
     return arr
 
-def hac(features):
-    clusters = set([Cluster(i,set([i]), 1) for i in range(len(features))])
+#the columns calc_features reads, in the same order
+FEATURE_COLUMNS = ["Attack", "Sp. Atk", "Speed", "Defense", "Sp. Def", "HP"]
+
+#Columnar loader: the CSV is parsed once straight into a contiguous (n x 6)
+#int64 array, row i equal to calc_features(load_data(filepath)[i]). The
+#array is cached next to the CSV as <csv>.features.npy with a .json holding
+#the CSV's mtime, size and sha256. Same mtime and size reuse the cache
+#without reading the CSV; otherwise the hash decides whether to re-parse.
+def load_features(filepath):
+    cachePath = filepath + '.features.npy'
+    metaPath = filepath + '.features.json'
+    stat = os.stat(filepath)
+
+    meta = None
+    if os.path.exists(cachePath) and os.path.exists(metaPath):
+        try:
+            with open(metaPath) as f:
+                meta = json.load(f)
+        except ValueError:
+            meta = None
+    if meta is not None and meta.get('columns') == FEATURE_COLUMNS:
+        if meta.get('mtime_ns') == stat.st_mtime_ns and meta.get('size') == stat.st_size:
+            return np.load(cachePath)
+        digest = fileDigest(filepath)
+        if meta.get('sha256') == digest:
+            #only touched, not changed
+            meta['mtime_ns'] = stat.st_mtime_ns
+            meta['size'] = stat.st_size
+            writeAtomic(metaPath, json.dumps(meta).encode())
+            return np.load(cachePath)
+    else:
+        digest = fileDigest(filepath)
+
+    features = parseFeatures(filepath)
+    #the .json is only updated once the .npy it describes is in place
+    if writeAtomic(cachePath, features):
+        writeAtomic(metaPath, json.dumps({'columns': FEATURE_COLUMNS, 'mtime_ns': stat.st_mtime_ns,
+                                          'size': stat.st_size, 'sha256': digest}).encode())
+    return features
+
+#parse the FEATURE_COLUMNS of the CSV into an (n x 6) int64 array without
+#building per-row dicts
+def parseFeatures(filepath):
+    with open(filepath, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        columns = [header.index(name) for name in FEATURE_COLUMNS]
+        values = np.fromiter((int(row[i]) for row in reader for i in columns), dtype=np.int64)
+    return values.reshape(-1, len(FEATURE_COLUMNS))
+
+def fileDigest(filepath):
+    sha = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+#write bytes (or an array, as .npy) to a per-process temp file and rename it
+#into place, so concurrent writers never publish each other's half-written
+#file. The cache is optional: a read-only directory or a full disk just means
+#no cache, the temp file is removed and False is returned.
+def writeAtomic(path, data):
+    tmp = '%s.%d.tmp' % (path, os.getpid())
+    try:
+        with open(tmp, 'wb') as f:
+            if isinstance(data, np.ndarray):
+                np.save(f, data)
+            else:
+                f.write(data)
+        os.replace(tmp, path)
+        return True
+    except OSError:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return False
+
+#mode picks the merge engine, every mode returns the same Z:
+#  'scan' - rescans all cluster and point pairs on every merge
+#  'heap' - priority queue of cluster distances, updated after each merge
+#  'lance-williams' - cluster-level distance matrix updated row by row with
+#                     the Lance-Williams formula and per-cluster nearest
+#                     neighbours
+#distances may be a condensed matrix from getCondensedDistances(features)
+#computed earlier, otherwise it is built here
+def hac(features, mode='scan', distances=None):
+    if distances is None:
+        distances = getCondensedDistances(features)
+    if mode == 'heap':
+        return hacHeap(features, distances)
+    if mode == 'lance-williams':
+        return linkageCore(distances.copy(), len(features), completeUpdate)
+    if mode != 'scan':
+        raise ValueError("unknown hac mode: %r" % (mode,))
+
+    #clusters by id, so the two clusters to merge are found in O(1)
+    membership = ClusterMembership(len(features))
+    clusters = {i: Cluster(i, i, 1, membership) for i in range(len(features))}
     Z = []
     newDataset = features
     origLen = len(newDataset)
-    distance_matrix = getDistances(features)
+    distance_matrix = distances
 
     for x in range(origLen-1):
-        min = getMinDistance(distance_matrix, clusters)
-
-        # get the matching clusters
-        cluster1 = None
-        cluster2 = None
-        for cluster in clusters:
-            if min[1] == cluster.id:
-                cluster1 = cluster
-            if min[2] == cluster.id:
-                cluster2 = cluster
+        min = getMinDistance(distance_matrix, clusters.values())
+
+        # get the matching clusters and remove them
+        cluster1 = clusters.pop(min[1])
+        cluster2 = clusters.pop(min[2])
         
-        newPoints = cluster1.points.union(cluster2.points)
+        newRoot = membership.union(cluster1.root, cluster2.root)
         newSize = cluster1.numPoints + cluster2.numPoints
 
         ## get the index that is smaller
@@ -72,17 +219,336 @@ def hac(features):
         smallerInd = cluster1.id if cluster1.id < cluster2.id else cluster2.id
 
         ## add to the thingy
-        newCluster = Cluster(origLen + x, newPoints, newSize)
+        newCluster = Cluster(origLen + x, newRoot, newSize, membership)
         Z.append([smallerInd, largerInd, min[0], newCluster.numPoints])
 
-        # remove the clusters and add the new one
-        clusters.remove(cluster1)
-        clusters.remove(cluster2)
-        clusters.add(newCluster)
+        # add the new one
+        clusters[newCluster.id] = newCluster
     
     return np.array(Z)
 
-    
+
+#Complete linkage with a heap of (distance, smaller id, larger id) entries.
+#Popping the heap gives the same pair getMinDistance would pick, including
+#its tie-breaking on the smaller cluster id. After a merge the new cluster's
+#distances are max() of the two old rows (exactly the complete-linkage
+#distance, no re-scan of members) and stale entries are skipped lazily.
+def hacHeap(features, distances=None):
+    n = len(features)
+    if n < 2:
+        return np.zeros((0, 4))
+    if distances is None:
+        distances = getCondensedDistances(features)
+
+    #square distance matrix indexed by slot; a cluster lives in the slot of
+    #its lowest original point
+    dist = condensedToSquare(distances, n)
+
+    slotId = np.arange(n)          #cluster id currently held by each slot
+    size = np.ones(n, dtype=np.int64)
+    alive = np.ones(n, dtype=bool)
+    idSlot = {i: i for i in range(n)}
+
+    upper = np.triu_indices(n, 1)
+    heap = list(zip(distances.tolist(), upper[0].tolist(), upper[1].tolist()))
+    heapq.heapify(heap)
+
+    Z = []
+    for x in range(n-1):
+        #skip entries that refer to clusters merged away already
+        while True:
+            d, a, b = heapq.heappop(heap)
+            if a in idSlot and b in idSlot:
+                break
+
+        slotA = idSlot.pop(a)
+        slotB = idSlot.pop(b)
+        newId = n + x
+        newSize = size[slotA] + size[slotB]
+        Z.append([a, b, d, newSize])
+
+        #complete linkage: d(k, a+b) = max(d(k, a), d(k, b))
+        row = np.maximum(dist[slotA], dist[slotB])
+        dist[slotA] = row
+        dist[:, slotA] = row
+        alive[slotB] = False
+        size[slotA] = newSize
+        slotId[slotA] = newId
+        idSlot[newId] = slotA
+
+        others = np.flatnonzero(alive)
+        others = others[others != slotA]
+        for k, dk in zip(slotId[others].tolist(), row[others].tolist()):
+            heapq.heappush(heap, (dk, k, newId))
+
+    return np.array(Z, dtype=np.float64)
+
+#Lance-Williams update for complete linkage: the distance from cluster k to
+#the merge of a and b is max(d(k, a), d(k, b)); the other arguments (d(a, b)
+#and the cluster sizes) are part of the general formula and unused here
+def completeUpdate(distA, distB, distAB, sizeA, sizeB, sizeK):
+    return np.maximum(distA, distB)
+
+#Lance-Williams updates of the other linkages, written for Euclidean
+#distances the way scipy.cluster.hierarchy.linkage applies them
+def singleUpdate(distA, distB, distAB, sizeA, sizeB, sizeK):
+    return np.minimum(distA, distB)
+
+def averageUpdate(distA, distB, distAB, sizeA, sizeB, sizeK):
+    return (sizeA * distA + sizeB * distB) / (sizeA + sizeB)
+
+def weightedUpdate(distA, distB, distAB, sizeA, sizeB, sizeK):
+    return (distA + distB) / 2
+
+def centroidUpdate(distA, distB, distAB, sizeA, sizeB, sizeK):
+    size = sizeA + sizeB
+    squared = (sizeA * distA**2 + sizeB * distB**2) / size - sizeA * sizeB * distAB**2 / size**2
+    #rounding can leave a tiny negative value for coincident centroids
+    return np.sqrt(np.maximum(squared, 0))
+
+def wardUpdate(distA, distB, distAB, sizeA, sizeB, sizeK):
+    size = sizeA + sizeB + sizeK
+    return np.sqrt(((sizeA + sizeK) * distA**2 + (sizeB + sizeK) * distB**2 - sizeK * distAB**2) / size)
+
+LINKAGE_UPDATES = {
+    'single': singleUpdate,
+    'complete': completeUpdate,
+    'average': averageUpdate,
+    'weighted': weightedUpdate,
+    'centroid': centroidUpdate,
+    'ward': wardUpdate,
+}
+
+#One entry point for every linkage: all methods run on the same condensed
+#matrix and linkageCore, only the update rule differs. method='complete'
+#gives the same Z as hac(features).
+def hacLinkage(features, method='complete', distances=None):
+    if method not in LINKAGE_UPDATES:
+        raise ValueError("unknown linkage method: %r" % (method,))
+    if distances is None:
+        distances = getCondensedDistances(features)
+    else:
+        distances = np.array(distances, dtype=np.float64)
+    return linkageCore(distances, len(features), LINKAGE_UPDATES[method])
+
+#nearest neighbour of slot a among the live slots: the smallest
+#(distance, smaller id, larger id) key, the same order getMinDistance uses
+def nearestNeighbour(dist, n, a, alive, slotId):
+    others = np.flatnonzero(alive)
+    others = others[others != a]
+    if len(others) == 0:
+        return -1, inf
+    row = dist[condensedRowIndices(n, a, others)]
+    tied = others[row == row.min()]
+    if len(tied) > 1:
+        ids = slotId[tied]
+        low = np.minimum(ids, slotId[a])
+        high = np.maximum(ids, slotId[a])
+        tied = tied[np.lexsort((high, low))]
+    return tied[0], row.min()
+
+#nearest neighbours of all live slots in one sequential pass over dist, read
+#tileRows rows at a time: row i of the condensed matrix holds d(i, j) for
+#j > i, so it gives slot i its best neighbour to the right and is a candidate
+#for the neighbour of every j > i (the column minima). Keys are compared as
+#(distance, smaller id, larger id) like nearestNeighbour, so the result is
+#the same, without gathering every slot's column entries across the matrix.
+def initialNeighbours(dist, n, alive, slotId, tileRows=1024):
+    nnSlot = np.full(n, -1, dtype=np.int64)
+    nnDist = np.full(n, inf, dtype=np.float64)
+    for start in range(0, n-1, tileRows):
+        stop = min(start + tileRows, n-1)
+        begin = condensedIndex(n, start, start+1)
+        tile = np.asarray(dist[begin:condensedIndex(n, stop-1, n-1) + 1])
+        offset = 0
+        for i in range(start, stop):
+            row = tile[offset:offset + n-1-i]
+            offset += n-1-i
+            if not alive[i]:
+                continue
+            right = np.flatnonzero(alive[i+1:]) + i+1
+            if len(right) == 0:
+                continue
+            values = row[right - (i+1)]
+            ids = slotId[right]
+            low = np.minimum(ids, slotId[i])
+            high = np.maximum(ids, slotId[i])
+
+            #column minima: slot i as the neighbour of every live j > i
+            current = nnSlot[right]
+            curLow = np.where(current >= 0, np.minimum(slotId[current], ids), -1)
+            curHigh = np.where(current >= 0, np.maximum(slotId[current], ids), -1)
+            curDist = nnDist[right]
+            better = (values < curDist) | ((values == curDist) &
+                                           ((low < curLow) | ((low == curLow) & (high < curHigh))))
+            nnSlot[right[better]] = i
+            nnDist[right[better]] = values[better]
+
+            #row minimum: the best j > i for slot i, against what the
+            #earlier rows already gave it
+            k = np.lexsort((high, low, values))[0]
+            if nnSlot[i] < 0:
+                better = True
+            else:
+                curIds = sorted((slotId[nnSlot[i]], slotId[i]))
+                better = (values[k], low[k], high[k]) < (nnDist[i], curIds[0], curIds[1])
+            if better:
+                nnSlot[i], nnDist[i] = right[k], values[k]
+    return nnSlot, nnDist
+
+#Generic agglomerative clustering on a condensed matrix that is overwritten
+#in place: slot i holds one live cluster, merging a and b keeps the merged
+#cluster in a's slot and rewrites that row with update(). Every slot tracks
+#its nearest neighbour, so a merge costs O(n) row work plus recomputing the
+#rows whose neighbour was a or b.
+#state = (slotId, size, alive, Z) continues an earlier run; onMerge(a, b,
+#distAB, newSize) is called before a merge touches dist. The starting
+#nearest neighbours are found by initialNeighbours in tiles of tileRows rows.
+def linkageCore(dist, n, update, state=None, onMerge=None, tileRows=1024):
+    if n < 2:
+        return np.zeros((0, 4))
+
+    if state is None:
+        slotId = np.arange(n)
+        size = np.ones(n, dtype=np.int64)
+        alive = np.ones(n, dtype=bool)
+        Z = []
+    else:
+        slotId, size, alive, Z = state
+    nnSlot, nnDist = initialNeighbours(dist, n, alive, slotId, tileRows)
+
+    for x in range(len(Z), n-1):
+        #global closest pair = best nearest-neighbour key over live slots
+        live = np.flatnonzero(alive)
+        partner = nnSlot[live]
+        low = np.minimum(slotId[live], slotId[partner])
+        high = np.maximum(slotId[live], slotId[partner])
+        best = live[np.lexsort((high, low, nnDist[live]))[0]]
+        a, b = best, nnSlot[best]
+        if slotId[a] > slotId[b]:
+            a, b = b, a
+        distAB = nnDist[best]
+        newSize = size[a] + size[b]
+        if onMerge is not None:
+            onMerge(a, b, distAB, newSize)
+        Z.append([slotId[a], slotId[b], distAB, newSize])
+
+        others = np.flatnonzero(alive)
+        others = others[(others != a) & (others != b)]
+        rowA = condensedRowIndices(n, a, others)
+        rowB = condensedRowIndices(n, b, others)
+        newRow = update(dist[rowA], dist[rowB], distAB, size[a], size[b], size[others])
+        dist[rowA] = newRow
+
+        alive[b] = False
+        size[a] = newSize
+        slotId[a] = n + x
+
+        #rows that pointed at a or b lost their neighbour, the merged cluster
+        #may be a closer neighbour for the rest (the new id is the largest, so
+        #it never wins a tie)
+        stale = others[(nnSlot[others] == a) | (nnSlot[others] == b)]
+        closer = (newRow < nnDist[others]) & (nnSlot[others] != a) & (nnSlot[others] != b)
+        nnSlot[others[closer]] = a
+        nnDist[others[closer]] = newRow[closer]
+        for k in stale:
+            nnSlot[k], nnDist[k] = nearestNeighbour(dist, n, k, alive, slotId)
+        nnSlot[a], nnDist[a] = nearestNeighbour(dist, n, a, alive, slotId)
+
+    return np.array(Z, dtype=np.float64)
+
+#Out-of-core hac for datasets whose condensed matrix does not fit in memory.
+#Everything lives in workdir:
+#  distances.dat - the condensed matrix as a float64 memmap, written in tiles
+#                  of tileRows rows and then updated in place by the merges
+#  meta.json     - n, method, a fingerprint of features and how many rows of
+#                  distances.dat are built
+#  merges.bin    - write-ahead journal, one (slot a, slot b, distance, size)
+#                  record per merge, written before the merge touches the
+#                  matrix
+#Only O(n) state (slots, sizes, nearest neighbours) is held in memory. If the
+#process dies, calling hacOutOfCore again with the same workdir and features
+#finishes the
+#build, replays the journal and re-applies the last merge's row update;
+#single and complete updates are idempotent, so that is always safe.
+def hacOutOfCore(features, workdir, method='complete', tileRows=1024):
+    if method not in ('single', 'complete'):
+        raise ValueError("out-of-core hac supports single and complete linkage, not %r" % (method,))
+    update = LINKAGE_UPDATES[method]
+    data = np.asarray(features, dtype=np.float64)
+    n = len(data)
+    if n < 2:
+        return np.zeros((0, 4))
+    #a workdir is only resumed for the very same input
+    fingerprint = hashlib.sha256(repr(data.shape).encode() + data.tobytes()).hexdigest()
+
+    os.makedirs(workdir, exist_ok=True)
+    distPath = os.path.join(workdir, 'distances.dat')
+    metaPath = os.path.join(workdir, 'meta.json')
+    journalPath = os.path.join(workdir, 'merges.bin')
+
+    meta = None
+    if os.path.exists(metaPath) and os.path.exists(distPath):
+        with open(metaPath) as f:
+            meta = json.load(f)
+        if meta.get('n') != n or meta.get('method') != method or meta.get('fingerprint') != fingerprint:
+            meta = None
+    if meta is None:
+        #fresh start, anything left in workdir belongs to another run
+        meta = {'n': n, 'method': method, 'fingerprint': fingerprint, 'rowsBuilt': 0}
+        if os.path.exists(journalPath):
+            os.remove(journalPath)
+        dist = np.memmap(distPath, dtype=np.float64, mode='w+', shape=(condensedSize(n),))
+    else:
+        dist = np.memmap(distPath, dtype=np.float64, mode='r+', shape=(condensedSize(n),))
+
+    #build (or finish building) the matrix one tile at a time
+    for start in range(meta['rowsBuilt'], n, tileRows):
+        fillCondensedRows(data, dist, start, start + tileRows)
+        dist.flush()
+        meta['rowsBuilt'] = min(start + tileRows, n)
+        with open(metaPath + '.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(metaPath + '.tmp', metaPath)
+
+    #replay the journal; a torn trailing record is dropped
+    slotId = np.arange(n)
+    size = np.ones(n, dtype=np.int64)
+    alive = np.ones(n, dtype=bool)
+    Z = []
+    records = np.zeros((0, 4))
+    if os.path.exists(journalPath):
+        with open(journalPath, 'rb') as f:
+            raw = f.read()
+        records = np.frombuffer(raw[:len(raw) // 32 * 32], dtype=np.float64).reshape(-1, 4)
+    for a, b, distAB, newSize in records:
+        a, b = int(a), int(b)
+        Z.append([slotId[a], slotId[b], distAB, int(newSize)])
+        alive[b] = False
+        size[a] = int(newSize)
+        slotId[a] = n + len(Z) - 1
+    if len(records):
+        #the last merge may have crashed half-way through its row update
+        a, b = int(records[-1][0]), int(records[-1][1])
+        others = np.flatnonzero(alive)
+        others = others[others != a]
+        rowA = condensedRowIndices(n, a, others)
+        dist[rowA] = update(dist[rowA], dist[condensedRowIndices(n, b, others)], records[-1][2],
+                            None, None, None)
+        dist.flush()
+
+    with open(journalPath, 'ab') as journal:
+        journal.truncate(len(records) * 32)
+
+        def onMerge(a, b, distAB, newSize):
+            journal.write(np.array([a, b, distAB, newSize], dtype=np.float64).tobytes())
+            journal.flush()
+
+        Z = linkageCore(dist, n, update, (slotId, size, alive, Z), onMerge, tileRows)
+    dist.flush()
+    del dist
+    return Z
+
 def imshow_hac(Z):
     plt.figure()
     dn = hierarchy.dendrogram(Z)
@@ -100,10 +566,113 @@ def getDistances(data):
             distance[point][point2] = np.linalg.norm(data[point2] - data[point])
     return distance
 
+#Condensed distance matrix: the upper triangle d(0,1), d(0,2), ..., d(0,n-1),
+#d(1,2), ... as one float64 array of n(n-1)/2 entries (scipy's pdist layout).
+#Each row block is computed from exact coordinate differences, so the values
+#are the same as np.linalg.norm in getDistances.
+def getCondensedDistances(data):
+    data = np.asarray(data, dtype=np.float64)
+    distances = np.empty(condensedSize(len(data)), dtype=np.float64)
+    fillCondensedRows(data, distances, 0, len(data))
+    return distances
+
+#write rows start..stop-1 of the condensed matrix of data into distances,
+#which may be any writable float64 buffer (array, memmap, shared memory)
+def fillCondensedRows(data, distances, start, stop):
+    n = len(data)
+    for i in range(start, min(stop, n-1)):
+        diff = data[i+1:] - data[i]
+        begin = condensedIndex(n, i, i+1)
+        np.sqrt(np.einsum('ij,ij->i', diff, diff), out=distances[begin:begin + n-1-i])
+
+#Same matrix as getCondensedDistances, built by a process pool. The rows are
+#split into blocks holding about the same number of entries (row i has
+#n-1-i), and every worker writes its blocks straight into one shared
+#file-backed buffer, so nothing but the block bounds travels between
+#processes. The returned np.memmap is that same buffer, no copy is made; it
+#is writable, so hac(distances=...) and linkageCore can use it as is.
+#With path the matrix is kept in that file. Otherwise it goes to a temp file
+#that is unlinked as soon as it is mapped, and its space is released once
+#the returned array is dropped.
+def getCondensedDistancesParallel(data, processes=None, blocksPerProcess=4, path=None):
+    data = np.asarray(data, dtype=np.float64)
+    n = len(data)
+    total = condensedSize(n)
+    if total == 0:
+        return np.empty(0, dtype=np.float64)
+    processes = processes or os.cpu_count() or 1
+
+    #cut the rows where the running entry count crosses each equal share
+    rowEnds = np.cumsum(np.arange(n-1, 0, -1))
+    shares = np.linspace(0, total, processes * blocksPerProcess + 1)[1:-1]
+    bounds = np.unique(np.concatenate(([0], np.searchsorted(rowEnds, shares, side='right'), [n-1])))
+    blocks = list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+    temporary = path is None
+    if temporary:
+        fd, path = tempfile.mkstemp(suffix='.distances.dat')
+        os.close(fd)
+    try:
+        #size the file, the workers map it and fill their rows in place
+        np.memmap(path, dtype=np.float64, mode='w+', shape=(total,)).flush()
+        with Pool(processes, initializer=initDistanceWorker, initargs=(path, data)) as pool:
+            pool.starmap(fillMappedRows, blocks)
+        distances = np.memmap(path, dtype=np.float64, mode='r+', shape=(total,))
+    finally:
+        if temporary:
+            os.remove(path)
+    return distances
+
+#per-worker state of getCondensedDistancesParallel
+_workerDistances = None
+_workerData = None
+
+def initDistanceWorker(path, data):
+    global _workerDistances, _workerData
+    _workerDistances = np.memmap(path, dtype=np.float64, mode='r+', shape=(condensedSize(len(data)),))
+    _workerData = data
+
+def fillMappedRows(start, stop):
+    fillCondensedRows(_workerData, _workerDistances, start, stop)
+
+#number of entries of a condensed matrix over n points
+def condensedSize(n):
+    return n * (n - 1) // 2
+
+#number of points n of a condensed matrix with size entries
+def condensedPoints(size):
+    return int(round((1 + np.sqrt(1 + 8 * size)) / 2))
+
+#position of d(i, j), i != j, in a condensed matrix over n points; i and j
+#may also be numpy arrays
+def condensedIndex(n, i, j):
+    low = np.minimum(i, j)
+    high = np.maximum(i, j)
+    return n * low - low * (low + 1) // 2 + (high - low - 1)
+
+#positions of d(i, k) for every k in others (none of them equal to i)
+def condensedRowIndices(n, i, others):
+    return condensedIndex(n, i, np.asarray(others))
+
+#full n x n matrix with a zero diagonal from a condensed matrix
+def condensedToSquare(distances, n):
+    square = np.zeros((n, n), dtype=np.float64)
+    upper = np.triu_indices(n, 1)
+    square[upper] = distances
+    square[(upper[1], upper[0])] = distances
+    return square
+
 #Get max distance 
+#distances is either the n x n list from getDistances or a condensed array
 def getMinDistance(distances, clusters):
     min = [inf, 0, 0]
+    condensed = isinstance(distances, np.ndarray) and distances.ndim == 1
+    if condensed:
+        n = condensedPoints(len(distances))
     scannedClusters = set([]) #keep track of clusters weve already looked at
+    #visit clusters by id so every pair is seen as (smaller id, larger id) and
+    #ties go to the smaller index no matter how the set happens to iterate
+    clusters = sorted(clusters, key=lambda cluster: cluster.id)
     
     #Iterate through clusters and compare points
     for cluster in clusters:
@@ -112,17 +681,33 @@ def getMinDistance(distances, clusters):
 
             if clusterComp.id in scannedClusters: continue
 
-            localDist = []
-            
-            #Iterate through each point in the cluster
-            for point in cluster.points:
-                for pointComp in clusterComp.points:
-                    
-                    # add to the list
-                    localDist.append(distances[point][pointComp])
+            if condensed and cluster.numPoints * clusterComp.numPoints >= 64:
+                #gather every point pair of the two clusters at once
+                points = np.fromiter(cluster.points, dtype=np.int64)
+                pointsComp = np.fromiter(clusterComp.points, dtype=np.int64)
+                localMax = float(distances[condensedIndex(n, points[:, None], pointsComp[None, :])].max())
+            elif condensed:
+                #few pairs, plain index arithmetic beats the numpy call overhead
+                localMax = -inf
+                for point in cluster.points:
+                    for pointComp in clusterComp.points:
+                        low, high = (point, pointComp) if point < pointComp else (pointComp, point)
+                        dist = distances.item(n * low - low * (low + 1) // 2 + (high - low - 1))
+                        if dist > localMax:
+                            localMax = dist
+            else:
+                localDist = []
+                
+                #Iterate through each point in the cluster
+                for point in cluster.points:
+                    for pointComp in clusterComp.points:
+                        
+                        # add to the list
+                        localDist.append(distances[point][pointComp])
+                localMax = max(localDist)
             
             ## Check if the distance is a minimum
-            dataVal = [max(localDist), cluster.id, clusterComp.id]
+            dataVal = [localMax, cluster.id, clusterComp.id]
 
             if dataVal[0] < min[0]:
                 min = dataVal
@@ -0,0 +1,32 @@
+import argparse
+import numpy as np
+from scipy.cluster.hierarchy import linkage
+
+import hw4
+
+
+#compare hw4.hacLinkage with scipy for every method; random normal data has
+#no tied distances, so the merge order (and Z) must agree exactly up to
+#rounding of the updated distances
+def main(args):
+    rng = np.random.default_rng(args.seed)
+    data = rng.normal(size=(args.n, args.d))
+    failed = False
+    for method in hw4.LINKAGE_UPDATES:
+        Z = hw4.hacLinkage(data, method)
+        reference = linkage(data, method)
+        same = np.array_equal(Z[:, [0, 1, 3]], reference[:, [0, 1, 3]])
+        err = np.max(np.abs(Z[:, 2] - reference[:, 2]))
+        ok = same and err < 1e-9
+        failed = failed or not ok
+        print("%-9s ids/sizes %-5s max height error %.2e  %s" % (method, same, err, "ok" if ok else "MISMATCH"))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='cross-validate hw4.hacLinkage against scipy')
+    parser.add_argument('--n', default=500, type=int)
+    parser.add_argument('--d', default=6, type=int)
+    parser.add_argument('--seed', default=0, type=int)
+    args = parser.parse_args()
+    raise SystemExit(main(args))
@@ -38,13 +38,19 @@ def point_distance(point1, point2):
     return math.sqrt( pow(point1[0]-point2[0], 2) + pow(point1[1]-point2[1], 2))
 
 
-def load_data(filepath):
+# columns load_data converts to numbers
+NUMERIC_COLUMNS = ["#", "Total", "HP", "Attack", "Defense", "Sp. Atk", "Sp. Def", "Speed"]
+# the six stats calculate_x_y adds up, x from the first three, y from the rest
+X_Y_COLUMNS = ["Attack", "Sp. Atk", "Speed", "Defense", "Sp. Def", "HP"]
+
+
+def load_data(filepath, limit=20):
     with open(filepath, newline="") as csvfile:
         return_list = []
         reader = csv.DictReader(csvfile)
         count = 0
         for row in reader:
-            if count != 20:
+            if limit is None or count != limit:
                 del row["Generation"]
                 del row["Legendary"]
                 return_list.append(row)
@@ -70,12 +76,55 @@ def calculate_x_y(stats):
     return return_tuple
 
 
+def load_array(filepath, limit=None, columns=None):
+    # streams the csv row by row into a float array of shape (rows, columns)
+    # without keeping any per-row dicts; reading stops after limit rows and
+    # only the given columns (default NUMERIC_COLUMNS) are kept. Cells that
+    # are empty or not numbers become nan, to be dropped by filter_finite.
+    if columns is None:
+        columns = NUMERIC_COLUMNS
+    with open(filepath, newline="") as csvfile:
+        reader = csv.reader(csvfile)
+        header = next(reader)
+        index = [header.index(name) for name in columns]
+
+        def cells():
+            for count, row in enumerate(reader):
+                if limit is not None and count >= limit:
+                    return
+                for i in index:
+                    try:
+                        yield float(row[i])
+                    except (ValueError, IndexError):
+                        yield math.nan
+
+        values = np.fromiter(cells(), dtype=np.float64)
+    return values.reshape(-1, len(columns))
+
+
+def load_x_y(filepath, limit=None):
+    # (x, y) of every row as calculate_x_y computes it, as an (n, 2) array
+    # with the non-finite rows already removed
+    stats = load_array(filepath, limit, X_Y_COLUMNS)
+    points = np.stack([stats[:, :3].sum(axis=1), stats[:, 3:].sum(axis=1)], axis=1)
+    return filter_finite(points)
+
+
+def finite_mask(dataset):
+    # one vectorized test: True for the rows whose values are all finite
+    points = np.asarray(dataset, dtype=np.float64)
+    if points.ndim == 1:
+        points = points.reshape(len(points), -1 if len(points) else 0)
+    return np.isfinite(points).all(axis=1)
+
+
+def filter_finite(points):
+    points = np.asarray(points, dtype=np.float64)
+    return points[finite_mask(points)]
+
+
 def hac(dataset):
-    for points in dataset:
-        if math.isnan(points[0]) or math.isnan(points[1]):
-            dataset.remove(points)
-        elif not math.isfinite(points[0]) or not math.isfinite(points[1]):
-            dataset.remove(points)
+    dataset = [points for points, keep in zip(dataset, finite_mask(dataset)) if keep]
 
     Z = []
     for x in range (0, len(dataset)-1):
@@ -206,6 +255,69 @@ def hac(dataset):
     return np.matrix(Z)
 
 
+def hac_mst(dataset):
+    # single linkage in O(n^2) time and O(n) memory: Prim's algorithm grows a
+    # minimum spanning tree over the (x, y) points keeping one distance per
+    # point, then the tree edges are merged in order of length with a
+    # union-find. Edges are recorded and sorted the way
+    # scipy.cluster.hierarchy.linkage(method='single') does, so ties come
+    # out the same as well.
+    points = np.asarray(dataset, dtype=np.float64).reshape(-1, 2)
+    n = len(points)
+    if n < 2:
+        return np.zeros((0, 4))
+
+    # points not in the tree yet, kept in index order so argmin breaks ties
+    # on the lowest index; each one's distance to the tree so far
+    rest = np.arange(1, n)
+    restX = points[1:, 0].copy()
+    restY = points[1:, 1].copy()
+    dist = np.full(n - 1, np.inf)
+    edges = np.zeros((n - 1, 3))
+    x = 0
+    for k in range(n - 1):
+        dx = restX - points[x, 0]
+        dy = restY - points[x, 1]
+        np.minimum(dist, np.sqrt(dx * dx + dy * dy), out=dist)
+        j = int(np.argmin(dist))
+        y = int(rest[j])
+        edges[k] = (x, y, dist[j])
+        rest = np.delete(rest, j)
+        restX = np.delete(restX, j)
+        restY = np.delete(restY, j)
+        dist = np.delete(dist, j)
+        x = y
+
+    edges = edges[np.argsort(edges[:, 2], kind='mergesort')]
+
+    # union-find over points; label[root] is the cluster id of that tree
+    parent = list(range(n))
+    label = list(range(n))
+    size = [1] * n
+
+    def find(point):
+        while parent[point] != point:
+            parent[point] = parent[parent[point]]
+            point = parent[point]
+        return point
+
+    Z = np.zeros((n - 1, 4))
+    for k in range(n - 1):
+        root1 = find(int(edges[k][0]))
+        root2 = find(int(edges[k][1]))
+        Z[k][0] = min(label[root1], label[root2])
+        Z[k][1] = max(label[root1], label[root2])
+        Z[k][2] = edges[k][2]
+        if size[root1] < size[root2]:
+            root1, root2 = root2, root1
+        parent[root2] = root1
+        size[root1] += size[root2]
+        label[root1] = n + k
+        Z[k][3] = size[root1]
+
+    return Z
+
+
 def random_x_y(m):
     return_list = []
 
@@ -217,11 +329,7 @@ def random_x_y(m):
 
 
 def imshow_hac(dataset):
-    for points in dataset:
-        if math.isnan(points[0]) or math.isnan(points[1]):
-            dataset.remove(points)
-        elif not math.isfinite(points[0]) or not math.isfinite(points[1]):
-            dataset.remove(points)
+    dataset = [points for points, keep in zip(dataset, finite_mask(dataset)) if keep]
 
     Z = []
     for x in range(0, len(dataset) - 1):